@@ -2,6 +2,8 @@ import os
 import json
 from openai import OpenAI
 
+from diff_metrics import analyze_diffs_locally, LOCAL_CONFIDENCE_THRESHOLD
+
 
 try:
     client = OpenAI()
@@ -112,6 +114,10 @@ def analyze_issue_and_repo(issue_data, repo_data):
         print(f"Error in OpenAI call (analyze_issue_and_repo): {e}")
         return {"tech_stack": []}
 
+def format_recent_prs(recent_pr_list):
+    """Renders (repo, title) pairs from get_user_data as prompt lines."""
+    return "\n".join(f"PR to {repo}: {title}" for repo, title in recent_pr_list)
+
 def analyze_user(user_data, user_comment):
     """
     Uses OpenAI to analyze a user's profile and their issue comment
@@ -150,7 +156,7 @@ def analyze_user(user_data, user_comment):
     
     User's Recent PRs (titles):
     ---
-    {user_data.get('recent_prs')}
+    {format_recent_prs(user_data.get('recent_pr_list', []))}
     ---
     
     User's Public Repo Languages (from last 10 updated repos):
@@ -183,14 +189,21 @@ def analyze_user(user_data, user_comment):
     
 def analyze_contribution_quality(pr_diffs):
     """
-    Uses OpenAI to analyze the quality/complexity of past PR diffs.
+    Scores the quality/complexity of past PR diffs. The diffs are first
+    scored locally by diff_metrics; OpenAI is only consulted when the local
+    estimate's confidence is below LOCAL_CONFIDENCE_THRESHOLD.
     """
-    if not client:
-        raise Exception("OpenAI client is not initialized.")
-        
     if not pr_diffs:
         return {"average_complexity": 0, "summary": "No past PRs in this repo to analyze."}
 
+    local_analysis = analyze_diffs_locally(pr_diffs)
+    if local_analysis["confidence"] >= LOCAL_CONFIDENCE_THRESHOLD:
+        return local_analysis
+
+    if not client:
+        print("OpenAI client is not initialized; using local contribution analysis.")
+        return local_analysis
+
     system_prompt = """
     You are a senior software engineer. Analyze the provided code diffs from a
     user's past pull requests. Your task is to determine the average complexity
@@ -236,4 +249,4 @@ def analyze_contribution_quality(pr_diffs):
         
     except Exception as e:
         print(f"Error in OpenAI call (analyze_contribution_quality): {e}")
-        return {"average_complexity": 0, "summary": "Error analyzing PR diffs."}
\ No newline at end of file
+        return local_analysis
\ No newline at end of file
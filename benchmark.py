@@ -0,0 +1,126 @@
+"""
+Micro-benchmarks for the bot's local hot paths.
+
+    python benchmark.py
+"""
+import random
+import sys
+import time
+
+from cache_helper import CachedUser
+from diff_metrics import score_diff
+
+
+SAMPLE_DIFF = '''diff --git a/app/service.py b/app/service.py
+index 1111111..2222222 100644
+--- a/app/service.py
++++ b/app/service.py
+@@ -10,6 +10,18 @@ class Service:
+     def start(self):
+         self.running = True
+
++    def retry(self, job, attempts=3):
++        for attempt in range(attempts):
++            try:
++                return job()
++            except TimeoutError:
++                if attempt == attempts - 1:
++                    raise
++        return None
++
+     def stop(self):
+-        self.running = False
++        if self.running:
++            self.running = False
+diff --git a/web/client.js b/web/client.js
+index 3333333..4444444 100644
+--- a/web/client.js
++++ b/web/client.js
+@@ -1,4 +1,8 @@
+-export function load(url) {
+-  return fetch(url);
++export async function load(url, retries = 2) {
++  for (let i = 0; i <= retries; i++) {
++    try { return await fetch(url); } catch (e) { if (i === retries) throw e; }
++  }
+ }
+diff --git a/tests/test_service.py b/tests/test_service.py
+index 5555555..6666666 100644
+--- a/tests/test_service.py
++++ b/tests/test_service.py
+@@ -1,2 +1,6 @@
+ from app.service import Service
++
++def test_retry():
++    assert Service().retry(lambda: 1) == 1
++
+diff --git a/README.md b/README.md
+index 7777777..8888888 100644
+--- a/README.md
++++ b/README.md
+@@ -1,1 +1,2 @@
+ # Service
++Now with retries.
+'''
+
+
+def bench_diff_scoring(iterations=2000):
+    """Reports how many diffs per second diff_metrics.score_diff can handle."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        score_diff(SAMPLE_DIFF)
+    elapsed = time.perf_counter() - start
+    print(f"diff scoring: {iterations / elapsed:,.0f} diffs/sec ({elapsed / iterations * 1000:.3f} ms/diff)")
+
+
+def deep_sizeof(obj, seen):
+    """Recursively sums sys.getsizeof over obj, counting objects already in `seen` once."""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(deep_sizeof(getattr(obj, name), seen) for name in obj.__slots__)
+    return size
+
+
+def fake_user_data(rng, repos, languages):
+    """Builds a get_user_data-shaped dict with realistic sizes (3 x 4KB diffs, ~10 PR titles)."""
+    recent_pr_list = [
+        # Rebuild strings per user, as they would arrive from separate API responses.
+        ("".join(rng.choice(repos)), f"Fix {rng.randrange(10**6)} in the request handler")
+        for _ in range(rng.randint(3, 12))
+    ]
+    return {
+        "bio": "Backend developer. Open source enthusiast." * rng.randint(0, 2),
+        "recent_pr_list": recent_pr_list,
+        "repo_contribution_count": rng.randint(0, 20),
+        "repo_languages": ["".join(lang) for lang in rng.sample(languages, 4)],
+        "pr_diffs": [(SAMPLE_DIFF * 4)[:4000] + str(rng.random()) for _ in range(3)],
+    }
+
+
+def bench_cache_entry_size(entries=500):
+    """Compares per-entry memory of the old dict cache values against CachedUser records."""
+    rng = random.Random(0)
+    repos = [f"org{i}/project{i}" for i in range(50)]
+    languages = ["Python", "JavaScript", "TypeScript", "Go", "Rust", "Java", "C++", "Ruby"]
+    analysis = {"average_complexity": 5.5, "summary": "3 past PR(s) touching 8 file(s), mostly code changes with tests."}
+
+    users = [fake_user_data(rng, repos, languages) for _ in range(entries)]
+    raw_values = [{"user_data": user, "contribution_analysis": dict(analysis)} for user in users]
+    compact_values = [CachedUser.from_analysis(user, analysis) for user in users]
+
+    raw_size = deep_sizeof(raw_values, set()) / entries
+    compact_size = deep_sizeof(compact_values, set()) / entries
+    print(f"cache entry (dict):       {raw_size:,.0f} bytes")
+    print(f"cache entry (CachedUser): {compact_size:,.0f} bytes ({raw_size / compact_size:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    bench_diff_scoring()
+    bench_cache_entry_size()
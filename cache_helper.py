@@ -1,12 +1,84 @@
+import hashlib
+import sys
+
 from cachetools import TTLCache
 
-# Create a cache that holds a maximum of 500 users.
+# Create a cache that holds a maximum of 5000 users.
 # Each user's data expires after 72 hours (72 * 60 * 60 seconds).
-user_cache = TTLCache(maxsize=500, ttl=72 * 60 * 60)
+# Entries are compact CachedUser records (see benchmark.py for per-entry size),
+# so this costs about what 500 raw user_data dicts used to.
+user_cache = TTLCache(maxsize=5000, ttl=72 * 60 * 60)
 
-# We will cache a dictionary like this:
+# We will cache a CachedUser like this:
 # key = username
-# value = {
-#     "user_data": { ... from get_user_data ... },
-#     "contribution_analysis": { ... from analyze_contribution_quality ... }
-# }
\ No newline at end of file
+# value = CachedUser.from_analysis(user_data, contribution_analysis)
+
+# Installation access tokens are valid for 1 hour; reuse them for 50 minutes.
+# key = installation_id
+# value = access token string
+token_cache = TTLCache(maxsize=1000, ttl=50 * 60)
+
+# Per-process hit/miss counters, reported per shard by shard_dispatcher.
+cache_stats = {"user_hits": 0, "user_misses": 0, "token_hits": 0, "token_misses": 0}
+
+
+class CachedUser:
+    """
+    Compact cache record holding only the fields analyze_user and
+    calculate_score read. Raw PR diffs are kept as SHA-256 digests, and
+    repo and language names are interned so they are shared across entries.
+    """
+    __slots__ = (
+        "bio",
+        "pr_repos",
+        "pr_titles",
+        "repo_contribution_count",
+        "repo_languages",
+        "diff_digests",
+        "average_complexity",
+        "contribution_summary",
+    )
+
+    def __init__(self, bio, pr_repos, pr_titles, repo_contribution_count,
+                 repo_languages, diff_digests, average_complexity, contribution_summary):
+        self.bio = bio
+        self.pr_repos = pr_repos
+        self.pr_titles = pr_titles
+        self.repo_contribution_count = repo_contribution_count
+        self.repo_languages = repo_languages
+        self.diff_digests = diff_digests
+        self.average_complexity = average_complexity
+        self.contribution_summary = contribution_summary
+
+    @classmethod
+    def from_analysis(cls, user_data, contribution_analysis):
+        """Builds a record from get_user_data and analyze_contribution_quality output."""
+        recent_pr_list = user_data.get('recent_pr_list', [])
+
+        return cls(
+            bio=user_data.get('bio') or "",
+            pr_repos=tuple(sys.intern(repo) for repo, _ in recent_pr_list),
+            pr_titles=tuple(title for _, title in recent_pr_list),
+            repo_contribution_count=user_data.get('repo_contribution_count', 0),
+            repo_languages=tuple(sys.intern(lang) for lang in user_data.get('repo_languages', [])),
+            diff_digests=tuple(hashlib.sha256(diff.encode('utf-8')).digest() for diff in user_data.get('pr_diffs', [])),
+            average_complexity=contribution_analysis.get('average_complexity', 0),
+            contribution_summary=contribution_analysis.get('summary', ''),
+        )
+
+    def to_user_data(self, username):
+        """Rebuilds the user_data dict shape expected by analyze_user and calculate_score."""
+        return {
+            "username": username,
+            "bio": self.bio,
+            "recent_pr_list": list(zip(self.pr_repos, self.pr_titles)),
+            "repo_contribution_count": self.repo_contribution_count,
+            "repo_languages": list(self.repo_languages),
+        }
+
+    def to_contribution_analysis(self):
+        """Rebuilds the analyze_contribution_quality result used by calculate_score."""
+        return {
+            "average_complexity": self.average_complexity,
+            "summary": self.contribution_summary,
+        }
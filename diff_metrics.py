@@ -0,0 +1,285 @@
+import ast
+import math
+import re
+import textwrap
+import warnings
+
+
+# Below this confidence the local estimate is handed to the LLM instead.
+LOCAL_CONFIDENCE_THRESHOLD = 0.6
+
+# Score bands used by scoring.calculate_score for repo_contributions.
+# Averages that land right next to one of these are treated as less certain.
+SCORE_BAND_EDGES = (4, 7, 9)
+
+PYTHON_EXTENSIONS = {".py", ".pyi"}
+JS_EXTENSIONS = {".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx"}
+CODE_EXTENSIONS = PYTHON_EXTENSIONS | JS_EXTENSIONS | {
+    ".c", ".h", ".cc", ".cpp", ".hpp", ".cs", ".go", ".java", ".kt", ".rb",
+    ".rs", ".php", ".swift", ".scala", ".sh", ".sql", ".vue", ".svelte",
+}
+DOC_EXTENSIONS = {".md", ".rst", ".txt", ".adoc"}
+DOC_NAMES = {"license", "changelog", "authors", "contributing", "readme"}
+
+HUNK_HEADER = re.compile(r"^@@ -\d+(?:,(\d+))? \+\d+(?:,(\d+))? @@")
+TEST_PATH = re.compile(r"(^|/)(tests?|__tests__|spec)/|(^|/)test_[^/]*$|_test\.[^/]+$|\.(test|spec)\.[^/]+$")
+PYTHON_STRUCTURE = re.compile(r"^\s*(def|async def|class|if|elif|else|for|while|try|except|finally|with|return|raise|yield|lambda)\b")
+JS_STRUCTURE = re.compile(r"\b(function|class|if|else|for|while|switch|case|try|catch|finally|return|throw|await)\b|=>")
+
+PYTHON_STRUCTURAL_NODES = (
+    ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.If, ast.For,
+    ast.AsyncFor, ast.While, ast.Try, ast.With, ast.AsyncWith, ast.Return,
+    ast.Raise, ast.Lambda, ast.comprehension,
+)
+
+
+def classify_path(path):
+    """Returns (category, language) for a file path from a diff header."""
+    lowered = path.lower()
+    name = lowered.rsplit("/", 1)[-1]
+    stem, dot, ext = name.rpartition(".")
+    ext = dot + ext if dot else ""
+
+    if ext in PYTHON_EXTENSIONS:
+        language = "python"
+    elif ext in JS_EXTENSIONS:
+        language = "js"
+    elif ext in CODE_EXTENSIONS:
+        language = "other"
+    else:
+        language = None
+
+    if TEST_PATH.search(lowered):
+        return "test", language
+    if ext in DOC_EXTENSIONS or (stem or name) in DOC_NAMES or lowered.startswith("docs/"):
+        return "docs", language
+    if language:
+        return "code", language
+    return "other", language
+
+
+def parse_unified_diff(diff_text):
+    """
+    Splits a unified diff into per-file records holding the path, its
+    category/language, and the added and removed lines of every hunk.
+    Also reports whether the diff ends in the middle of a hunk, which
+    happens when github_helper truncates large diffs.
+    """
+    files = []
+    current = None
+    old_left = new_left = 0
+    hunk = None
+
+    # Split on "\n" only: str.splitlines() also breaks on characters like
+    # U+2028 that can appear inside file content and would desync the hunk counts.
+    lines = diff_text.split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+
+    for line in lines:
+        if line.endswith("\r"):
+            line = line[:-1]
+        if old_left > 0 or new_left > 0:
+            tag = line[:1]
+            if tag == "+":
+                hunk[0].append(line[1:])
+                new_left -= 1
+                continue
+            if tag == "-":
+                hunk[1].append(line[1:])
+                old_left -= 1
+                continue
+            if tag == " " or line == "":
+                old_left -= 1
+                new_left -= 1
+                continue
+            if tag == "\\":
+                continue
+            # Malformed counts; fall through and treat as a header line.
+            old_left = new_left = 0
+
+        if line.startswith("diff --git "):
+            current = None
+            parts = line.split(" b/", 1)
+            if len(parts) == 2:
+                current = _new_file(files, parts[1])
+        elif line.startswith("+++ "):
+            path = line[4:].split("\t", 1)[0]
+            if path != "/dev/null":
+                path = path[2:] if path.startswith("b/") else path
+                if current is None or current["path"] != path:
+                    current = _new_file(files, path)
+        elif line.startswith("--- ") and current is None:
+            path = line[4:].split("\t", 1)[0]
+            if path != "/dev/null":
+                current = _new_file(files, path[2:] if path.startswith("a/") else path)
+        elif line.startswith("Binary files ") and current is not None:
+            current["binary"] = True
+        else:
+            match = HUNK_HEADER.match(line)
+            if match and current is not None:
+                old_left = int(match.group(1) or 1)
+                new_left = int(match.group(2) or 1)
+                hunk = ([], [])
+                current["hunks"].append(hunk)
+
+    return files, (old_left > 0 or new_left > 0)
+
+
+def _new_file(files, path):
+    category, language = classify_path(path)
+    record = {"path": path, "category": category, "language": language, "hunks": [], "binary": False}
+    files.append(record)
+    return record
+
+
+def python_change_size(lines):
+    """
+    Counts structural AST nodes (defs, branches, loops, ...) in a block of
+    Python lines. Hunks are fragments, so when they don't parse on their own
+    we fall back to a per-line keyword scan. Returns (count, parsed).
+    """
+    if not lines:
+        return 0, True
+    try:
+        # Third-party code may contain e.g. invalid escapes; don't spam the logs.
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            tree = ast.parse(textwrap.dedent("\n".join(lines)))
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        return sum(1 for line in lines if PYTHON_STRUCTURE.match(line)), False
+    return sum(1 for node in ast.walk(tree) if isinstance(node, PYTHON_STRUCTURAL_NODES)), True
+
+
+def js_change_size(lines):
+    """Counts structural JS/TS tokens (functions, branches, loops, arrows, ...) in a block of lines."""
+    return sum(len(JS_STRUCTURE.findall(line)) for line in lines)
+
+
+def compute_diff_metrics(diff_text):
+    """
+    Computes cheap static signals for a single unified diff: files and lines
+    touched, the split between code/tests/docs, and the structural change
+    size for Python and JS files.
+    """
+    files, truncated = parse_unified_diff(diff_text or "")
+
+    metrics = {
+        "files": sum(1 for record in files if not record["binary"]),
+        "binary_files": sum(1 for record in files if record["binary"]),
+        "added": 0,
+        "removed": 0,
+        "lines": {"code": 0, "test": 0, "docs": 0, "other": 0},
+        "code_files": 0,
+        "unknown_code_lines": 0,
+        "structural_changes": 0,
+        "python_hunks": 0,
+        "python_hunks_parsed": 0,
+        "truncated": truncated,
+    }
+
+    for record in files:
+        file_lines = 0
+        for added, removed in record["hunks"]:
+            metrics["added"] += len(added)
+            metrics["removed"] += len(removed)
+            file_lines += len(added) + len(removed)
+
+            if record["language"] == "python":
+                for block in (added, removed):
+                    if not block:
+                        continue
+                    size, parsed = python_change_size(block)
+                    metrics["structural_changes"] += size
+                    metrics["python_hunks"] += 1
+                    metrics["python_hunks_parsed"] += parsed
+            elif record["language"] == "js":
+                metrics["structural_changes"] += js_change_size(added) + js_change_size(removed)
+
+        metrics["lines"][record["category"]] += file_lines
+        if record["category"] == "code":
+            metrics["code_files"] += 1
+            if record["language"] == "other":
+                metrics["unknown_code_lines"] += file_lines
+
+    return metrics
+
+
+def estimate_complexity(metrics):
+    """
+    Maps diff metrics to a 1-10 complexity estimate (same scale the LLM uses)
+    and a 0-1 confidence in that estimate.
+    """
+    lines = metrics["lines"]
+    code_lines = lines["code"]
+    total_lines = sum(lines.values())
+
+    if total_lines == 0:
+        # Binary-only or hunk-less diffs: something changed, but nothing we can read.
+        return 1.0, 0.3 if metrics["files"] or metrics["binary_files"] else 0.5
+
+    if code_lines == 0 and lines["test"] == 0:
+        # Docs/config only: the "typo or doc update" end of the scale.
+        return round(1 + min(1.0, total_lines / 200), 1), 0.9
+
+    size = min(5.0, 5 * math.log2(1 + code_lines) / math.log2(1 + 400))
+    structure = min(2.5, metrics["structural_changes"] * 0.25)
+    spread = min(1.0, max(0, metrics["code_files"] - 1) * 0.25)
+    tests = 0.5 if lines["test"] > 0 else 0.0
+    complexity = round(max(1.0, min(10.0, 1 + size + structure + spread + tests)), 1)
+
+    confidence = 0.9
+    if metrics["truncated"]:
+        confidence -= 0.2
+    if metrics["python_hunks"]:
+        failed = 1 - metrics["python_hunks_parsed"] / metrics["python_hunks"]
+        confidence -= 0.3 * failed
+    if code_lines:
+        confidence -= 0.3 * metrics["unknown_code_lines"] / code_lines
+    return complexity, round(max(0.0, confidence), 2)
+
+
+def score_diff(diff_text):
+    """Scores a single diff. Returns a dict with metrics, complexity and confidence."""
+    metrics = compute_diff_metrics(diff_text)
+    complexity, confidence = estimate_complexity(metrics)
+    return {"metrics": metrics, "complexity": complexity, "confidence": confidence}
+
+
+def analyze_diffs_locally(pr_diffs):
+    """
+    Local counterpart of analyzer.analyze_contribution_quality. Returns the
+    same shape ("average_complexity", "summary") plus a "confidence" the
+    caller uses to decide whether the LLM still needs to be consulted.
+    """
+    if not pr_diffs:
+        return {"average_complexity": 0, "summary": "No past PRs in this repo to analyze.", "confidence": 1.0}
+
+    results = [score_diff(diff) for diff in pr_diffs]
+
+    average = round(sum(r["complexity"] for r in results) / len(results), 1)
+    confidence = sum(r["confidence"] for r in results) / len(results)
+    # scoring.calculate_score bands the average; one sitting on an edge always
+    # drops below LOCAL_CONFIDENCE_THRESHOLD so the LLM breaks the tie.
+    if any(abs(average - edge) < 0.3 for edge in SCORE_BAND_EDGES):
+        confidence -= 0.35
+    confidence = round(max(0.0, confidence), 2)
+
+    files = sum(r["metrics"]["files"] for r in results)
+    added = sum(r["metrics"]["added"] for r in results)
+    removed = sum(r["metrics"]["removed"] for r in results)
+    totals = {key: sum(r["metrics"]["lines"][key] for r in results) for key in ("code", "test", "docs")}
+
+    if added == 0 and removed == 0:
+        summary = f"{len(results)} past PR(s) with no readable text changes."
+        return {"average_complexity": average, "summary": summary, "confidence": confidence}
+
+    if totals["code"] == 0 and totals["test"] == 0:
+        kind = "only documentation/config changes"
+    elif totals["test"] > 0:
+        kind = "mostly code changes with tests"
+    else:
+        kind = "mostly code changes without tests"
+
+    summary = f"{len(results)} past PR(s) touching {files} file(s) (+{added}/-{removed} lines), {kind}."
+    return {"average_complexity": average, "summary": summary, "confidence": confidence}
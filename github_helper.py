@@ -4,6 +4,8 @@ import jwt
 import requests
 from github import Github, Auth
 
+from cache_helper import token_cache, cache_stats
+
 
 def get_github_app_jwt():
     """
@@ -57,9 +59,15 @@ def get_github_client(installation_id):
     if not installation_id:
         raise ValueError("Installation ID is required")
         
-    access_token = get_installation_access_token(installation_id)
-    if not access_token:
-        raise Exception("Failed to get installation access token")
+    access_token = token_cache.get(installation_id)
+    if access_token:
+        cache_stats["token_hits"] += 1
+    else:
+        cache_stats["token_misses"] += 1
+        access_token = get_installation_access_token(installation_id)
+        if not access_token:
+            raise Exception("Failed to get installation access token")
+        token_cache[installation_id] = access_token
 
     auth = Auth.Token(access_token)
     
@@ -114,7 +122,7 @@ def get_user_data(client, username, repo_full_name):
         bio = user.bio or ""
         
         events = user.get_public_events()
-        pr_details = []
+        recent_pr_list = []
         
         for event in events[:30]:
             if event.type == 'PullRequestEvent':
@@ -122,7 +130,7 @@ def get_user_data(client, username, repo_full_name):
                 pr_title = pr.get('title')
                 pr_repo = event.repo.name
                 if pr_title:
-                    pr_details.append(f"PR to {pr_repo}: {pr_title}")
+                    recent_pr_list.append((pr_repo, pr_title))
         
         repo_contribution_count = 0
         
@@ -166,7 +174,7 @@ def get_user_data(client, username, repo_full_name):
 
         return {
             "bio": bio,
-            "recent_prs": "\n".join(pr_details),
+            "recent_pr_list": recent_pr_list,
             "repo_contribution_count": repo_contribution_count,
             "repo_languages": list(repo_languages),
             "pr_diffs": pr_diffs
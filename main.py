@@ -1,8 +1,10 @@
 import os
+import atexit
 import json
 import hmac
 import hashlib
-from flask import Flask, request, abort
+import threading
+from flask import Flask, request, abort, jsonify
 from dotenv import load_dotenv
 
 from github_helper import (
@@ -18,7 +20,8 @@ from analyzer import (
     analyze_contribution_quality
 )
 from scoring import calculate_score
-from cache_helper import user_cache  
+from cache_helper import user_cache, cache_stats, CachedUser
+from shard_dispatcher import ShardPool
 
 load_dotenv()
 
@@ -26,6 +29,22 @@ app = Flask(__name__)
 
 GITHUB_WEBHOOK_SECRET = os.environ.get('GITHUB_WEBHOOK_SECRET')
 
+# Number of shard worker processes. 0 handles events inline in the web process.
+# When set, run a single gunicorn worker so there is one dispatcher per host.
+SHARD_WORKERS = int(os.environ.get('SHARD_WORKERS', '0'))
+shard_pool = None
+# Gunicorn threads can race on the first webhook; only one of them may build the pool.
+shard_pool_lock = threading.Lock()
+
+def get_shard_pool():
+    """Starts the shard worker pool on first use."""
+    global shard_pool
+    with shard_pool_lock:
+        if shard_pool is None:
+            shard_pool = ShardPool(process_issue_comment, SHARD_WORKERS)
+            atexit.register(shard_pool.close)
+        return shard_pool
+
 def verify_signature(payload_body, signature_header):
     """Verify that the payload was sent from GitHub."""
     if not signature_header:
@@ -39,6 +58,99 @@ def verify_signature(payload_body, signature_header):
     if not hmac.compare_digest(expected_signature, signature_header):
         abort(403, 'Signatures do not match')
 
+def process_issue_comment(data):
+    """
+    Scores the commenter on a new issue comment and posts the report.
+    Runs inline in the web process, or inside a shard worker when
+    SHARD_WORKERS is set.
+    """
+    comment_body_original = data.get('comment', {}).get('body', '')
+
+    try:
+        repo_full_name = data.get('repository', {}).get('full_name')
+        issue_number = data.get('issue', {}).get('number')
+        commenter_username = data.get('comment', {}).get('user', {}).get('login')
+        installation_id = data.get('installation', {}).get('id')
+        
+        if not all([repo_full_name, issue_number, commenter_username, installation_id]):
+            print("Incomplete data from webhook.")
+            return "Incomplete data", 400
+
+        print(f"Request detected from '{commenter_username}' on {repo_full_name}#{issue_number}")
+
+        print("Authenticating...")
+        client = get_github_client(installation_id)
+        
+        
+        cached_data = user_cache.get(commenter_username)
+        
+        if cached_data:
+            print(f"Cache HIT for user: {commenter_username}")
+            cache_stats["user_hits"] += 1
+            user_data = cached_data.to_user_data(commenter_username)
+            contribution_analysis = cached_data.to_contribution_analysis()
+        
+        else:
+            print(f"Cache MISS for user: {commenter_username}")
+            cache_stats["user_misses"] += 1
+            
+            print("Fetching GitHub user data (expensive)...")
+            user_data = get_user_data(client, commenter_username, repo_full_name)
+            user_data['username'] = commenter_username
+            
+            print("Analyzing contribution quality (expensive)...")
+            contribution_analysis = analyze_contribution_quality(user_data.get('pr_diffs', []))
+            
+            user_cache[commenter_username] = CachedUser.from_analysis(user_data, contribution_analysis)
+      
+        print("Fetching issue/repo data...")
+        issue_data = get_issue_data(client, repo_full_name, issue_number)
+        repo_data = get_repo_data(client, repo_full_name)
+        
+        if not all([issue_data, repo_data]):
+            print("Failed to fetch issue/repo data.")
+            return "Data fetching error", 500
+        
+        
+        print("--- C. Running AI Analysis (Issue-Specific) ---")
+        issue_tech_stack = analyze_issue_and_repo(issue_data, repo_data)
+        print(f"Issue tech stack: {issue_tech_stack}")
+        
+        user_analysis = analyze_user(user_data, comment_body_original)
+        print(f"User analysis: {user_analysis}")
+        
+
+        print("Calculating final score...")
+        report = calculate_score(
+            issue_tech_stack,
+            user_analysis,
+            user_data,
+            contribution_analysis,
+            repo_full_name
+        )
+        
+        print("Posting comment to issue...")
+        repo = client.get_repo(repo_full_name)
+        issue = repo.get_issue(number=issue_number)
+        issue.create_comment(report)
+
+    except Exception as e:
+        print(f"An error occurred in webhook handler: {e}")
+        try:
+            repo_full_name = data.get('repository', {}).get('full_name')
+            issue_number = data.get('issue', {}).get('number')
+            installation_id = data.get('installation', {}).get('id')
+            if all([repo_full_name, issue_number, installation_id]):
+                client = get_github_client(installation_id)
+                repo = client.get_repo(repo_full_name)
+                issue = repo.get_issue(number=issue_number)
+                issue.create_comment(f"🤖 Oops! An internal error occurred while trying to analyze the request. {e}")
+        except Exception as post_e:
+            print(f"Failed to post error comment: {post_e}")
+        return "Internal error", 500
+
+    return "Webhook processed", 200
+
 @app.route("/webhook", methods=['POST'])
 def github_webhook():
     """Main webhook endpoint to receive events from GitHub."""
@@ -54,97 +166,54 @@ def github_webhook():
     data = request.json
 
     if event == 'issue_comment' and data.get('action') == 'created':
-        
-        comment_body_original = data.get('comment', {}).get('body', '')
-        
+
         if data.get('comment', {}).get('user', {}).get('type') == 'Bot':
             return "Ignoring bot comment", 200
             
-        try:
-            repo_full_name = data.get('repository', {}).get('full_name')
-            issue_number = data.get('issue', {}).get('number')
-            commenter_username = data.get('comment', {}).get('user', {}).get('login')
-            installation_id = data.get('installation', {}).get('id')
-            
-            if not all([repo_full_name, issue_number, commenter_username, installation_id]):
-                print("Incomplete data from webhook.")
-                return "Incomplete data", 400
+        repo_full_name = data.get('repository', {}).get('full_name')
+        issue_number = data.get('issue', {}).get('number')
+        commenter_username = data.get('comment', {}).get('user', {}).get('login')
+        installation_id = data.get('installation', {}).get('id')
 
-            print(f"Request detected from '{commenter_username}' on {repo_full_name}#{issue_number}")
+        if not all([repo_full_name, issue_number, commenter_username, installation_id]):
+            print("Incomplete data from webhook.")
+            return "Incomplete data", 400
 
-            print("Authenticating...")
-            client = get_github_client(installation_id)
-            
-            
-            cached_data = user_cache.get(commenter_username)
-            
-            if cached_data:
-                print(f"Cache HIT for user: {commenter_username}")
-                user_data = cached_data["user_data"]
-                contribution_analysis = cached_data["contribution_analysis"]
-                user_data['username'] = commenter_username
-            
-            else:
-                print(f"Cache MISS for user: {commenter_username}")
-                
-                print("Fetching GitHub user data (expensive)...")
-                user_data = get_user_data(client, commenter_username, repo_full_name)
-                user_data['username'] = commenter_username
-                
-                print("Analyzing contribution quality (expensive)...")
-                contribution_analysis = analyze_contribution_quality(user_data.get('pr_diffs', []))
-                
-                user_cache[commenter_username] = {
-                    "user_data": user_data,
-                    "contribution_analysis": contribution_analysis
-                }
-          
-            print("Fetching issue/repo data...")
-            issue_data = get_issue_data(client, repo_full_name, issue_number)
-            repo_data = get_repo_data(client, repo_full_name)
-            
-            if not all([issue_data, repo_data]):
-                print("Failed to fetch issue/repo data.")
-                return "Data fetching error", 500
-            
-            
-            print("--- C. Running AI Analysis (Issue-Specific) ---")
-            issue_tech_stack = analyze_issue_and_repo(issue_data, repo_data)
-            print(f"Issue tech stack: {issue_tech_stack}")
-            
-            user_analysis = analyze_user(user_data, comment_body_original)
-            print(f"User analysis: {user_analysis}")
-            
+        if SHARD_WORKERS > 0:
+            shard = get_shard_pool().dispatch(installation_id, repo_full_name, data)
+            print(f"Queued event for {repo_full_name} on {shard}")
+            return "Webhook queued", 202
+
+        return process_issue_comment(data)
 
-            print("Calculating final score...")
-            report = calculate_score(
-                issue_tech_stack,
-                user_analysis,
-                user_data,
-                contribution_analysis,
-                repo_full_name
-            )
-            
-            print("Posting comment to issue...")
-            repo = client.get_repo(repo_full_name)
-            issue = repo.get_issue(number=issue_number)
-            issue.create_comment(report)
-
-        except Exception as e:
-            print(f"An error occurred in webhook handler: {e}")
-            try:
-                repo_full_name = data.get('repository', {}).get('full_name')
-                issue_number = data.get('issue', {}).get('number')
-                installation_id = data.get('installation', {}).get('id')
-                if all([repo_full_name, issue_number, installation_id]):
-                    client = get_github_client(installation_id)
-                    repo = client.get_repo(repo_full_name)
-                    issue = repo.get_issue(number=issue_number)
-                    issue.create_comment(f"🤖 Oops! An internal error occurred while trying to analyze the request. {e}")
-            except Exception as post_e:
-                print(f"Failed to post error comment: {post_e}")
-            
     return "Webhook processed", 200
 
+@app.route("/shards", methods=['GET'])
+def shard_stats():
+    """Per-shard load and cache-hit statistics."""
+    if SHARD_WORKERS <= 0:
+        abort(404, 'Sharding is not enabled')
+    return jsonify(get_shard_pool().stats())
+
+@app.route("/shards/resize", methods=['POST'])
+def shard_resize():
+    """
+    Resizes the running shard pool without a restart, so only the keys owned
+    by added/removed shards move. The body ({"size": N}) must be signed with
+    the webhook secret, like GitHub's deliveries.
+    """
+    verify_signature(request.data, request.headers.get('X-Hub-Signature-256'))
+    if SHARD_WORKERS <= 0:
+        abort(404, 'Sharding is not enabled')
+
+    size = (request.get_json(silent=True) or {}).get('size')
+    if not isinstance(size, int) or size < 1:
+        abort(400, 'Body must be {"size": N} with N >= 1')
+
+    pool = get_shard_pool()
+    print(f"Resizing shard pool from {pool.size()} to {size} shards")
+    pool.resize(size)
+    return jsonify(pool.stats())
+
 if __name__ == "__main__":
     app.run(port=5001, debug=True)
\ No newline at end of file
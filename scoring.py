@@ -53,7 +53,7 @@ def calculate_score(issue_tech_stack, user_analysis, user_github_data, contribut
         scores["repo_contributions"]["details"] = "No merged PRs found in this repository."
 
 
-    if user_github_data.get('recent_prs') and len(user_github_data['recent_prs']) > 0:
+    if user_github_data.get('recent_pr_list') and len(user_github_data['recent_pr_list']) > 0:
         scores["other_contributions"]["score"] = 1
         scores["other_contributions"]["details"] = "User has recent public PRs."
     else:
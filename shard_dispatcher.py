@@ -0,0 +1,277 @@
+import bisect
+import hashlib
+import multiprocessing
+import queue
+import threading
+
+from cache_helper import cache_stats
+
+
+class HashRing:
+    """
+    Consistent hash ring with virtual nodes. Adding or removing a node only
+    moves the keys that land on that node's points (~1/N of them), so the
+    other shards keep their warm caches.
+    """
+
+    def __init__(self, nodes=(), replicas=160):
+        self.replicas = replicas
+        self._points = []
+        self._owners = []
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key):
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+    def add(self, node):
+        for i in range(self.replicas):
+            point = self._hash(f"{node}#{i}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node):
+        keep = [(p, o) for p, o in zip(self._points, self._owners) if o != node]
+        self._points = [p for p, _ in keep]
+        self._owners = [o for _, o in keep]
+
+    def get(self, key):
+        if not self._points:
+            raise ValueError("Hash ring has no nodes")
+        index = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[index]
+
+
+def shard_key(installation_id, repo_full_name):
+    """Events for the same installation and repo always hash to the same shard."""
+    return f"{installation_id}:{repo_full_name}"
+
+
+# Counters each worker publishes in its own shared-memory array. Only the
+# worker writes and only the dispatcher reads, so no lock (and no pipe) is
+# involved and a killed worker can't block reporting for other shards.
+STAT_FIELDS = ("processed", "errors") + tuple(cache_stats)
+
+# How often an idle worker checks that the dispatcher process is still alive.
+PARENT_CHECK_INTERVAL = 5
+
+
+def _worker_loop(shard, handler, inbox, counters):
+    """
+    Runs in each shard process: handles events from its inbox and publishes
+    its load and cache counters into `counters` after every event. Handlers
+    return Flask-style (message, status) tuples; a non-2xx status or an
+    exception counts as an error. Exits on its own if the dispatcher dies
+    without shutting the pool down (e.g. gunicorn SIGKILLs it).
+    """
+    parent = multiprocessing.parent_process()
+    processed = 0
+    errors = 0
+    while True:
+        try:
+            payload = inbox.get(timeout=PARENT_CHECK_INTERVAL)
+        except queue.Empty:
+            if parent is not None and not parent.is_alive():
+                print(f"Shard {shard} lost its dispatcher, exiting.")
+                break
+            continue
+        if payload is None:
+            break
+        try:
+            result = handler(payload)
+            if isinstance(result, tuple) and not 200 <= result[-1] < 300:
+                errors += 1
+        except Exception as e:
+            errors += 1
+            print(f"Error in shard {shard} handler: {e}")
+        processed += 1
+        for index, value in enumerate((processed, errors, *cache_stats.values())):
+            counters[index] = value
+
+
+class ShardPool:
+    """
+    Fixed pool of worker processes. Events are routed by consistent hashing
+    on (installation_id, repo), so each process keeps hot per-process caches
+    (cache_helper) for its own shard of installations.
+    """
+
+    def __init__(self, handler, size):
+        self._ctx = multiprocessing.get_context("spawn")
+        self._handler = handler
+        self._ring = HashRing()
+        self._shards = {}
+        # Shards removed by resize() that are still draining their queue, and
+        # the final counters of those that have exited.
+        self._retired = []
+        self._retired_totals = None
+        self._lock = threading.Lock()
+        self.resize(size)
+
+    def _start(self, shard, state=None):
+        """Starts a worker for `shard`, carrying cumulative counters over from `state`."""
+        inbox = self._ctx.Queue()
+        counters = self._ctx.RawArray('q', len(STAT_FIELDS))
+        process = self._ctx.Process(
+            target=_worker_loop,
+            args=(shard, self._handler, inbox, counters),
+            name=f"anti-npc-{shard}",
+            daemon=True,
+        )
+        process.start()
+        new_state = {
+            "process": process,
+            "inbox": inbox,
+            "counters": counters,
+            # Events sent to this worker process, to tell how many it dropped.
+            "sent": 0,
+            "dispatched": 0,
+            "dropped": 0,
+            "restarts": 0,
+            "carried": [0] * len(STAT_FIELDS),
+        }
+        if state is not None:
+            for key in ("dispatched", "dropped", "restarts"):
+                new_state[key] = state[key]
+            new_state["carried"] = [a + b for a, b in zip(state["carried"], state["counters"])]
+        return new_state
+
+    @staticmethod
+    def _totals(state):
+        """Cumulative counters for a shard across all of its worker processes."""
+        counters = [a + b for a, b in zip(state["carried"], state["counters"])]
+        return {
+            "dispatched": state["dispatched"],
+            "dropped": state["dropped"],
+            "restarts": state["restarts"],
+            **dict(zip(STAT_FIELDS, counters)),
+        }
+
+    @staticmethod
+    def _finish(state):
+        """
+        Cleans up after an exited worker and counts the events it was sent
+        but never finished (zero after a clean drain). Returns that count.
+        """
+        state["process"].join()
+        state["inbox"].close()
+        state["inbox"].cancel_join_thread()
+        processed = state["counters"][STAT_FIELDS.index("processed")]
+        lost = max(0, state["sent"] - processed)
+        state["dropped"] += lost
+        return lost
+
+    def _stop(self, state):
+        """Asks a worker to finish its queue and exit; it is joined later by _collect_retired."""
+        state["inbox"].put(None)
+        self._retired.append(state)
+
+    def _collect_retired(self):
+        """Folds retired shards that have exited into _retired_totals."""
+        draining = []
+        for state in self._retired:
+            if state["process"].is_alive():
+                draining.append(state)
+                continue
+            lost = self._finish(state)
+            if lost:
+                print(f"Retired shard worker exited with {lost} event(s) unprocessed.")
+            totals = self._totals(state)
+            if self._retired_totals is None:
+                self._retired_totals = totals
+            else:
+                for key, value in totals.items():
+                    self._retired_totals[key] += value
+        self._retired = draining
+
+    def _reap(self, shard):
+        """Restarts the worker for `shard` if it died, logging the events it lost."""
+        state = self._shards[shard]
+        if state["process"].is_alive():
+            return state
+
+        lost = self._finish(state)
+        state["restarts"] += 1
+        print(
+            f"Shard {shard} worker died (exit code {state['process'].exitcode}); "
+            f"{lost} queued event(s) were dropped. Restarting it."
+        )
+        state = self._shards[shard] = self._start(shard, state)
+        return state
+
+    def resize(self, size):
+        """
+        Grows or shrinks the pool to `size` shards. Shards are named
+        shard-0..shard-N-1 so growing adds, and shrinking removes, only the
+        highest-numbered shards; removed shards drain their queue and exit.
+        """
+        if size < 1:
+            raise ValueError("ShardPool needs at least one shard")
+        with self._lock:
+            for index in range(len(self._shards), size):
+                shard = f"shard-{index}"
+                self._shards[shard] = self._start(shard)
+                self._ring.add(shard)
+            for index in range(len(self._shards) - 1, size - 1, -1):
+                shard = f"shard-{index}"
+                self._ring.remove(shard)
+                self._stop(self._shards.pop(shard))
+
+    def size(self):
+        """Current number of shards."""
+        with self._lock:
+            return len(self._shards)
+
+    def dispatch(self, installation_id, repo_full_name, payload):
+        """Queues `payload` on the shard owning (installation_id, repo). Returns the shard name."""
+        with self._lock:
+            shard = self._ring.get(shard_key(installation_id, repo_full_name))
+            state = self._reap(shard)
+            state["sent"] += 1
+            state["dispatched"] += 1
+            state["inbox"].put(payload)
+        return shard
+
+    def stats(self):
+        """
+        Per-shard load (dispatched, processed, queued, errors, dropped) and
+        cache hit counters. Shards removed by resize() are summed under
+        "retired", including any still draining, so totals never go down.
+        """
+        with self._lock:
+            self._collect_retired()
+
+            result = {}
+            for shard in list(self._shards):
+                state = self._reap(shard)
+                try:
+                    queued = state["inbox"].qsize()
+                except NotImplementedError:
+                    queued = None
+                result[shard] = {
+                    "alive": state["process"].is_alive(),
+                    "queued": queued,
+                    **self._totals(state),
+                }
+
+            if self._retired or self._retired_totals is not None:
+                retired = dict(self._retired_totals or {})
+                for state in self._retired:
+                    for key, value in self._totals(state).items():
+                        retired[key] = retired.get(key, 0) + value
+                retired["draining"] = len(self._retired)
+                result["retired"] = retired
+            return result
+
+    def close(self):
+        """Asks every shard to finish its queue and exit."""
+        with self._lock:
+            for state in self._shards.values():
+                self._stop(state)
+            for state in self._retired:
+                state["process"].join(timeout=10)
+            self._collect_retired()
+            self._shards.clear()
+            self._ring = HashRing()